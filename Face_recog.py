@@ -2,6 +2,8 @@ import os
 import cv2
 import face_recognition
 import pickle
+from RealTImeFaceRecog.frame_pool import FramePool, AllocationMeter
+from RealTImeFaceRecog.batching import MicroBatcher
 
 ENCODINGS_FILE = "encodings.pkl"
 
@@ -10,6 +12,20 @@ def create_encodings(dataset_dir="records_data", encodings_file=ENCODINGS_FILE):
     known_encodings = []
     known_names = []
 
+    def collect(key, _, encodings, error):
+        identity, path = key
+        if error:
+            print(f"[ERROR] Failed to process {path}: {error}")
+        elif encodings:
+            known_encodings.append(encodings[0])
+            known_names.append(identity)
+            print(f"[INFO] Encoded: {identity}")
+        else:
+            print(f"[WARNING] No face found in {path}")
+
+    # Throughput-oriented: big batches, images decoded and encoded in worker processes
+    batcher = MicroBatcher(collect, max_batch=32)
+
     for root, _, files in os.walk(dataset_dir):
         for file in files:
             if file.lower().endswith((".jpg", ".jpeg", ".png")):
@@ -18,15 +34,9 @@ def create_encodings(dataset_dir="records_data", encodings_file=ENCODINGS_FILE):
                 parts = os.path.normpath(path).split(os.sep)
                 identity = "/".join(parts[1:])  
 
-                img = face_recognition.load_image_file(path)
-                encodings = face_recognition.face_encodings(img)
+                batcher.add((identity, path), path)
 
-                if encodings:
-                    known_encodings.append(encodings[0])
-                    known_names.append(identity)
-                    print(f"[INFO] Encoded: {identity}")
-                else:
-                    print(f"[WARNING] No face found in {path}")
+    batcher.close()
 
     # Save encodings to file
     with open(encodings_file, "wb") as f:
@@ -44,50 +54,65 @@ def load_encodings(encodings_file=ENCODINGS_FILE):
 
 
 #  Real-time Recognition 
-def recognize_from_camera(known_encodings, known_names):
+def recognize_from_camera(known_encodings, known_names, measure_allocations=False):
     cap = cv2.VideoCapture(0)
+    # Latency-bounded: 2 frames or 20 ms per batch, one batch per worker in flight
+    batcher = MicroBatcher(max_batch=2, max_delay=0.02, workers=2)
+    pool = FramePool(cap, scale=0.25, ring_size=batcher.frames_held + 1)
+    meter = AllocationMeter() if measure_allocations else None
     print("[INFO] Starting camera... Press 'q' to quit")
 
-    while True:
-        ret, frame = cap.read()
+    running = True
+    while running:
+        # Read + resize + BGR->RGB into reused buffers
+        ret, frame, rgb_small = meter.call(pool.read) if meter else pool.read()
         if not ret:
             break
+        if meter:
+            meter.frame_done()
 
-        # Resize for speed
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        # Detect faces on the worker pool
+        batcher.add(frame, rgb_small)
 
-        # Detect faces
-        face_locations = face_recognition.face_locations(rgb_small)
-        face_encodings = face_recognition.face_encodings(rgb_small, face_locations)
+        # Frames come back in capture order once their batch is done
+        for frame, face_locations, face_encodings, error in batcher.results():
+            if error:
+                print(f"[ERROR] Recognition failed: {error}")
+                face_locations, face_encodings = [], []
 
-        for face_encoding, face_loc in zip(face_encodings, face_locations):
-            matches = face_recognition.compare_faces(known_encodings, face_encoding, tolerance=0.5)
-            face_distances = face_recognition.face_distance(known_encodings, face_encoding)
+            # Scale back
+            boxes = meter.call(pool.scale_boxes, face_locations) if meter else pool.scale_boxes(face_locations)
 
-            name = "Unknown"
-            if matches:
-                best_match_index = face_distances.argmin()
-                if matches[best_match_index]:
-                    name = known_names[best_match_index]
+            for face_encoding, (top, right, bottom, left) in zip(face_encodings, boxes):
+                matches = face_recognition.compare_faces(known_encodings, face_encoding, tolerance=0.5)
+                face_distances = face_recognition.face_distance(known_encodings, face_encoding)
 
-            # Scale back
-            top, right, bottom, left = [v * 4 for v in face_loc]
+                name = "Unknown"
+                if matches:
+                    best_match_index = face_distances.argmin()
+                    if matches[best_match_index]:
+                        name = known_names[best_match_index]
 
-            # Draw
-            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-            cv2.putText(frame, name, (left, top - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                # Draw
+                cv2.rectangle(frame, (int(left), int(top)), (int(right), int(bottom)), (0, 255, 0), 2)
+                cv2.putText(frame, name, (int(left), int(top) - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
 
-        cv2.imshow("Face Recognition", frame)
+            cv2.imshow("Face Recognition", frame)
 
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                running = False
+                break
 
+    if meter:
+        meter.report()
+        meter.stop()
+    batcher.close()
     cap.release()
     cv2.destroyAllWindows()
 
 
 if __name__ == "__main__":
     known_encodings, known_names = load_encodings()
-    recognize_from_camera(known_encodings, known_names)
+    recognize_from_camera(known_encodings, known_names,
+                          measure_allocations=os.environ.get("MEASURE_ALLOCATIONS") == "1")
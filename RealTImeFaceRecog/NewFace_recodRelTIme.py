@@ -4,11 +4,15 @@ import cv2
 import pickle
 import time
 import threading
+import numpy as np
 import face_recognition
 import scrapy
 from scrapy.crawler import CrawlerProcess
 from scrapy import Request
 from scrapy.pipelines.images import ImagesPipeline
+from frame_pool import FramePool, AllocationMeter
+from batching import MicroBatcher
+from image_ingest import OriginalBytesImagesMixin, open_draft, read_for_detection
 
 
 ENCODINGS_FILE = "encodings2.pkl"
@@ -16,12 +20,17 @@ IMAGES_DIR = "records_data"
 
 
 
-def update_encodings(new_image_path):
-    """Add encoding for a new image into encodings.pkl"""
-    if not os.path.exists(new_image_path):
-        return
+def update_encodings(new_image_path, img=None):
+    """Add encoding for a new image into encodings.pkl
+
+    `img` is the RGB array already decoded by the pipeline; the file is only
+    read back from disk when it is not given (e.g. cached downloads).
+    """
+    if img is None:
+        if not os.path.exists(new_image_path):
+            return
+        img = read_for_detection(new_image_path)
 
-    img = face_recognition.load_image_file(new_image_path)
     encs = face_recognition.face_encodings(img)
     if not encs:
         print(f"[WARNING] No face found in {new_image_path}")
@@ -115,7 +124,12 @@ class RecordSpider(scrapy.Spider):
             yield response.follow(nxt, self.parse_cities)
 
 
-class RecordImageHandler(ImagesPipeline):
+class RecordImageHandler(OriginalBytesImagesMixin, ImagesPipeline):
+    def open_spider(self, spider):
+        super().open_spider(spider)
+        # Draft-decoded arrays waiting for item_completed, keyed by request URL
+        self.decoded = {}
+
     def get_media_requests(self, item, info):
         for url in item.get("photos", []):
             yield Request(
@@ -139,58 +153,83 @@ class RecordImageHandler(ImagesPipeline):
 
         return os.path.join(st, ct, cy, nm)
 
+    def image_checked(self, request, body):
+        # Decode once (draft-scaled) for the encoder; request.url is already normalised
+        self.decoded[request.url] = np.asarray(open_draft(body))
+
     def item_completed(self, results, item, info):
+        # Pop every URL of the item so failed stores don't leave arrays behind;
+        # Request() applies the same URL normalisation get_images saw
+        decoded = {}
+        for url in item.get("photos", []):
+            key = Request(url).url
+            decoded[key] = self.decoded.pop(key, None)
         for ok, data in results:
             if ok:
                 img_path = os.path.join(IMAGES_DIR, data["path"])
                 print(f"[INFO] Stored: {img_path}")
                 # Update encodings whenever a new image is stored
-                update_encodings(img_path)
+                update_encodings(img_path, decoded.get(data["url"]))
         return item
 
 
 
 
-def recognize_from_camera():
+def recognize_from_camera(measure_allocations=False):
     cap = cv2.VideoCapture(0)
+    # Latency-bounded: 2 frames or 20 ms per batch, one batch per worker in flight
+    batcher = MicroBatcher(max_batch=2, max_delay=0.02, workers=2)
+    pool = FramePool(cap, scale=0.25, ring_size=batcher.frames_held + 1)
+    meter = AllocationMeter() if measure_allocations else None
     last_reload = 0
     known_encodings, known_names = load_encodings()
 
     print("[INFO] Starting camera... Press 'q' to quit")
 
-    while True:
+    running = True
+    while running:
         # Reload encodings every 30s
         if time.time() - last_reload > 30:
             known_encodings, known_names = load_encodings()
             print(f"[INFO] Reloaded encodings ({len(known_names)})")
             last_reload = time.time()
 
-        ret, frame = cap.read()
+        ret, frame, rgb_small = meter.call(pool.read) if meter else pool.read()
         if not ret:
             break
-
-        rgb_small = cv2.cvtColor(cv2.resize(frame, (0, 0), fx=0.25, fy=0.25), cv2.COLOR_BGR2RGB)
-        face_locations = face_recognition.face_locations(rgb_small)
-        face_encodings = face_recognition.face_encodings(rgb_small, face_locations)
-
-        for face_encoding, face_loc in zip(face_encodings, face_locations):
-            matches = face_recognition.compare_faces(known_encodings, face_encoding, tolerance=0.5)
-            name = "Unknown"
-
-            if matches:
-                best_match_index = face_recognition.face_distance(known_encodings, face_encoding).argmin()
-                if matches[best_match_index]:
-                    name = known_names[best_match_index]
-
-            top, right, bottom, left = [v * 4 for v in face_loc]
-            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-            cv2.putText(frame, name, (left, top - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-
-        cv2.imshow("Live Recognition", frame)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
-
+        if meter:
+            meter.frame_done()
+        batcher.add(frame, rgb_small)
+
+        # Frames come back in capture order once their batch is done
+        for frame, face_locations, face_encodings, error in batcher.results():
+            if error:
+                print(f"[ERROR] Recognition failed: {error}")
+                face_locations, face_encodings = [], []
+            boxes = meter.call(pool.scale_boxes, face_locations) if meter else pool.scale_boxes(face_locations)
+
+            for face_encoding, (top, right, bottom, left) in zip(face_encodings, boxes):
+                matches = face_recognition.compare_faces(known_encodings, face_encoding, tolerance=0.5)
+                name = "Unknown"
+
+                if matches:
+                    best_match_index = face_recognition.face_distance(known_encodings, face_encoding).argmin()
+                    if matches[best_match_index]:
+                        name = known_names[best_match_index]
+
+                cv2.rectangle(frame, (int(left), int(top)), (int(right), int(bottom)), (0, 255, 0), 2)
+                cv2.putText(frame, name, (int(left), int(top) - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+            cv2.imshow("Live Recognition", frame)
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                running = False
+                break
+
+    if meter:
+        meter.report()
+        meter.stop()
+    batcher.close()
     cap.release()
     cv2.destroyAllWindows()
 
@@ -208,4 +247,4 @@ if __name__ == "__main__":
     threading.Thread(target=run_scraper, daemon=True).start()
 
     # Start real-time recognition
-    recognize_from_camera()
+    recognize_from_camera(measure_allocations=os.environ.get("MEASURE_ALLOCATIONS") == "1")
@@ -10,8 +10,10 @@ import scrapy
 from scrapy.crawler import CrawlerProcess
 from scrapy import Request
 import requests
-from io import BytesIO
-from PIL import Image
+
+from frame_pool import FramePool, AllocationMeter
+from batching import MicroBatcher
+from image_ingest import decode_for_detection
 
 ENCODINGS_FILE = "encodings2.pkl"
 
@@ -33,6 +35,26 @@ def save_encodings(encs, person_name):
     print(f"[INFO] Added {len(encs)} encoding(s) for {person_name}")
 
 
+def save_result(key, _, encs, error):
+    """MicroBatcher callback: store one image's encodings (or report why not)."""
+    url, person_name = key
+    if error:
+        print(f"[ERROR] Failed to process {url}: {error}")
+        return
+    if not encs:
+        print(f"[WARNING] No face found in {url}")
+        return
+
+    # Save encodings with person's name
+    save_encodings(encs, person_name)
+
+
+# Throughput-oriented batches of raw downloads, decoded in the workers; the 10s
+# timer keeps new faces flowing to the live loop. Closed from __main__ so
+# nothing pending is lost on 'q'.
+ENCODER = MicroBatcher(save_result, max_batch=16, max_delay=10, decode=decode_for_detection)
+
+
 def load_encodings():
     if os.path.exists(ENCODINGS_FILE):
         with open(ENCODINGS_FILE, "rb") as f:
@@ -100,23 +122,18 @@ class RecordSpider(scrapy.Spider):
 
 
 class RecordEncodingHandler:
+    def close_spider(self, spider):
+        ENCODER.flush()
+
     def process_item(self, item, spider):
         for url in item.get("photos", []):
             try:
-                # Download image into memory
+                # Download image into memory; a worker decodes it once at detector resolution
                 resp = requests.get(url, timeout=10)
                 resp.raise_for_status()
-                img = np.array(Image.open(BytesIO(resp.content)).convert("RGB"))
-
-                # Encode faces
-                encs = face_recognition.face_encodings(img)
-                if not encs:
-                    print(f"[WARNING] No face found in {url}")
-                    continue
 
-                # Save encodings with person's name
-                person_name = item.get("person", "Unknown")
-                save_encodings(encs, person_name)
+                # Encode faces in the next batch
+                ENCODER.add((url, item.get("person", "Unknown")), resp.content)
 
             except Exception as e:
                 print(f"[ERROR] Failed to process {url}: {e}")
@@ -124,47 +141,62 @@ class RecordEncodingHandler:
         return item
 
 
-def recognize_from_camera():
+def recognize_from_camera(measure_allocations=False):
     cap = cv2.VideoCapture(0)
+    # Latency-bounded: 2 frames or 20 ms per batch, one batch per worker in flight
+    batcher = MicroBatcher(max_batch=2, max_delay=0.02, workers=2)
+    pool = FramePool(cap, scale=0.25, ring_size=batcher.frames_held + 1)
+    meter = AllocationMeter() if measure_allocations else None
     last_reload = 0
     known_encodings, known_names = load_encodings()
 
     print("[INFO] Starting camera... Press 'q' to quit")
 
-    while True:
+    running = True
+    while running:
         # Reload encodings every 30s
         if time.time() - last_reload > 30:
             known_encodings, known_names = load_encodings()
             print(f"[INFO] Reloaded encodings ({len(known_names)})")
             last_reload = time.time()
 
-        ret, frame = cap.read()
+        ret, frame, rgb_small = meter.call(pool.read) if meter else pool.read()
         if not ret:
             break
-
-        rgb_small = cv2.cvtColor(cv2.resize(frame, (0, 0), fx=0.25, fy=0.25), cv2.COLOR_BGR2RGB)
-        face_locations = face_recognition.face_locations(rgb_small)
-        face_encodings = face_recognition.face_encodings(rgb_small, face_locations)
-
-        for face_encoding, face_loc in zip(face_encodings, face_locations):
-            matches = face_recognition.compare_faces(known_encodings, face_encoding, tolerance=0.5)
-            name = "Unknown"
-
-            if True in matches:
-                distances = face_recognition.face_distance(known_encodings, face_encoding)
-                best_match_index = np.argmin(distances)
-                if matches[best_match_index]:
-                    name = known_names[best_match_index]
-
-            top, right, bottom, left = [v * 4 for v in face_loc]
-            cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-            cv2.putText(frame, name, (left, top - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-
-        cv2.imshow("Live Recognition", frame)
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
-
+        if meter:
+            meter.frame_done()
+        batcher.add(frame, rgb_small)
+
+        # Frames come back in capture order once their batch is done
+        for frame, face_locations, face_encodings, error in batcher.results():
+            if error:
+                print(f"[ERROR] Recognition failed: {error}")
+                face_locations, face_encodings = [], []
+            boxes = meter.call(pool.scale_boxes, face_locations) if meter else pool.scale_boxes(face_locations)
+
+            for face_encoding, (top, right, bottom, left) in zip(face_encodings, boxes):
+                matches = face_recognition.compare_faces(known_encodings, face_encoding, tolerance=0.5)
+                name = "Unknown"
+
+                if True in matches:
+                    distances = face_recognition.face_distance(known_encodings, face_encoding)
+                    best_match_index = np.argmin(distances)
+                    if matches[best_match_index]:
+                        name = known_names[best_match_index]
+
+                cv2.rectangle(frame, (int(left), int(top)), (int(right), int(bottom)), (0, 255, 0), 2)
+                cv2.putText(frame, name, (int(left), int(top) - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+            cv2.imshow("Live Recognition", frame)
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                running = False
+                break
+
+    if meter:
+        meter.report()
+        meter.stop()
+    batcher.close()
     cap.release()
     cv2.destroyAllWindows()
 
@@ -180,4 +212,8 @@ if __name__ == "__main__":
     threading.Thread(target=run_scraper, daemon=True).start()
 
     # Start real-time recognition
-    recognize_from_camera()
+    try:
+        recognize_from_camera(measure_allocations=os.environ.get("MEASURE_ALLOCATIONS") == "1")
+    finally:
+        # The scraper thread is a daemon; save faces still waiting for a batch
+        ENCODER.close()
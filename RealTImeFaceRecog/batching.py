@@ -0,0 +1,199 @@
+import multiprocessing
+import os
+import pickle
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+import face_recognition
+
+# Pools are started from timer/reactor threads while cv2 owns the main thread;
+# forking a multithreaded process can deadlock the child, so never use "fork".
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _load(image, decode):
+    if isinstance(image, bytes):
+        return decode(image) if decode else face_recognition.load_image_file(BytesIO(image))
+    if isinstance(image, str):
+        return face_recognition.load_image_file(image)
+    return image
+
+
+def _process_batch(payload, model, upsample, decode):
+    """Worker side: decode, detect and encode a whole batch in one call.
+
+    Returns one (locations, encodings, error) per image, so a bad image only
+    fails itself.
+    """
+    images = pickle.loads(payload)
+    out = [None] * len(images)
+    loaded = []
+    for i, image in enumerate(images):
+        try:
+            loaded.append((i, _load(image, decode)))
+        except Exception as e:
+            out[i] = (None, None, e)
+
+    batch_locations = None
+    if model == "cnn" and loaded and len({img.shape for _, img in loaded}) == 1:
+        # dlib's CNN detector runs same-sized images as one batch
+        try:
+            batch_locations = face_recognition.batch_face_locations(
+                [img for _, img in loaded], number_of_times_to_upsample=upsample, batch_size=len(loaded))
+        except Exception:
+            batch_locations = None
+
+    for n, (i, img) in enumerate(loaded):
+        try:
+            if batch_locations is not None:
+                locations = batch_locations[n]
+            else:
+                locations = face_recognition.face_locations(img, upsample, model)
+            out[i] = (locations, face_recognition.face_encodings(img, locations), None)
+        except Exception as e:
+            out[i] = (None, None, e)
+    return out
+
+
+class MicroBatcher:
+    """Micro-batching engine for face detection + encoding on worker processes.
+
+    Items (arrays, raw image bytes or file paths) are collected until
+    ``max_batch`` are pending or the oldest has waited ``max_delay`` seconds
+    (a timer fires, so nothing waits on the next ``add``). Each batch is
+    pickled on dispatch and processed by one worker in a single call; up to
+    ``max_in_flight`` batches run at once, so workers never sit behind a batch
+    barrier. Results come back in submission order, one
+    ``(key, locations, encodings, error)`` per item: passed to ``handle`` as
+    batches finish or, without a handler, collected with ``results()``.
+
+    Live video: small ``max_batch``, ``max_delay`` of a few ms, poll
+    ``results()`` every frame and keep ``frames_held`` frames valid. Bulk
+    ingest: large ``max_batch``, a handler, and ``close()`` at the end.
+    ``model="cnn"`` detects through ``batch_face_locations``; dlib's HOG
+    detector has no batch API.
+    """
+
+    def __init__(self, handle=None, max_batch=16, max_delay=None, model="hog", upsample=1,
+                 workers=None, max_in_flight=None, decode=None, executor=None):
+        self.handle = handle
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.model = model
+        self.upsample = upsample
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.workers
+        self.decode = decode
+        self.executor = executor
+        self.owns_executor = executor is None
+        self.pending = []
+        self.inflight = deque()
+        self.timer = None
+        self.closed = False
+        self.lock = threading.Lock()
+        self.dispatching = threading.Lock()
+        self.delivering = threading.Lock()
+
+    @property
+    def frames_held(self):
+        """Most items referenced at once (pending + dispatched, not yet collected)."""
+        return self.max_batch * (self.max_in_flight + 1)
+
+    def add(self, key, image):
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self.pending.append((key, image))
+            if len(self.pending) == 1 and self.max_delay is not None:
+                self.timer = threading.Timer(self.max_delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+            full = len(self.pending) >= self.max_batch
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Dispatch whatever is pending as one batch; doesn't wait for its results."""
+        with self.dispatching:
+            with self.lock:
+                pending, self.pending = self.pending, []
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+            if not pending:
+                return
+
+            # Backpressure: bound the number of batches running at once
+            while True:
+                with self.lock:
+                    running = [f for _, f in self.inflight if not f.done()]
+                if len(running) < self.max_in_flight:
+                    break
+                wait(running, return_when=FIRST_COMPLETED)
+
+            # Pickle now: the executor pickles lazily on its feeder thread, by
+            # which time a reused frame buffer may already hold the next frame
+            payload = pickle.dumps([image for _, image in pending], protocol=pickle.HIGHEST_PROTOCOL)
+            future = self._executor().submit(_process_batch, payload, self.model, self.upsample, self.decode)
+            with self.lock:
+                self.inflight.append(([key for key, _ in pending], future))
+
+        if self.handle:
+            future.add_done_callback(lambda _: self._deliver())
+
+    def results(self):
+        """Finished results in submission order, up to the first unfinished batch."""
+        out = []
+        while True:
+            with self.lock:
+                if not self.inflight or not self.inflight[0][1].done():
+                    return out
+                keys, future = self.inflight.popleft()
+            out.extend(self._unpack(keys, future))
+
+    def drain(self):
+        """Dispatch what is pending and wait for every batch.
+
+        Returns the remaining results (empty with a handler, which gets them instead).
+        """
+        self.flush()
+        with self.lock:
+            futures = [f for _, f in self.inflight]
+        wait(futures)
+        if self.handle:
+            self._deliver()
+            return []
+        return self.results()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+        out = self.drain()
+        if self.executor is not None and self.owns_executor:
+            self.executor.shutdown()
+        return out
+
+    def _executor(self):
+        if self.executor is None:
+            # Created lazily so importing the module never starts worker processes
+            self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                mp_context=multiprocessing.get_context(START_METHOD))
+        return self.executor
+
+    def _unpack(self, keys, future):
+        try:
+            items = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and self.owns_executor:
+                # A worker died (e.g. dlib crash); start a fresh pool on the next dispatch
+                self.executor = None
+            items = [(None, None, e)] * len(keys)
+        return [(key,) + tuple(item) for key, item in zip(keys, items)]
+
+    def _deliver(self):
+        # Done-callbacks fire on executor threads; deliver in order, one thread at a time
+        with self.delivering:
+            for result in self.results():
+                self.handle(*result)
@@ -0,0 +1,141 @@
+import tracemalloc
+import cv2
+import numpy as np
+
+
+class FramePool:
+    """Reusable capture/preprocessing buffers for the camera loops.
+
+    Frames are read into a ring of preallocated arrays with
+    ``cap.read(image=...)``, then shrunk and converted to RGB into fixed
+    ``dst=`` buffers, so a steady-state loop allocates no new arrays. Each ring
+    slot has its own RGB buffer, so the last ``ring_size`` frames stay valid
+    together with their RGB copies.
+    """
+
+    def __init__(self, cap, scale=0.25, ring_size=2, max_faces=8):
+        self.cap = cap
+        self.scale = scale
+        self.factor = int(round(1 / scale))
+        self.ring_size = ring_size
+        self.ring = []
+        self.index = 0
+        self.small = None
+        self.rgb = None
+        self.boxes = np.zeros((max_faces, 4), dtype=np.int32)
+        self.scaled = np.zeros((max_faces, 4), dtype=np.int32)
+        self.frames = 0
+        # Buffers (re)allocated by the pool itself; only grows on startup or a size change
+        self.allocations = 0
+
+    def _allocate(self, frame):
+        h, w = frame.shape[:2]
+        sw, sh = max(1, int(round(w * self.scale))), max(1, int(round(h * self.scale)))
+        self.ring = [frame] + [np.empty_like(frame) for _ in range(self.ring_size - 1)]
+        self.small = np.empty((sh, sw, 3), dtype=frame.dtype)
+        self.rgb = [np.empty((sh, sw, 3), dtype=frame.dtype) for _ in range(self.ring_size)]
+        self.allocations += 2 * self.ring_size + 1
+
+    def read(self):
+        """Grab the next frame into the ring; returns (ok, frame, rgb_small)."""
+        if not self.ring:
+            ret, frame = self.cap.read()
+            if not ret:
+                return False, None, None
+            self._allocate(frame)
+        else:
+            self.index = (self.index + 1) % self.ring_size
+            buf = self.ring[self.index]
+            ret, frame = self.cap.read(image=buf)
+            if not ret:
+                return False, None, None
+            if frame is not buf:
+                # Backend changed size/format; adopt the new frame and resize buffers
+                self.allocations += 1
+                if frame.shape != buf.shape:
+                    self._allocate(frame)
+                    self.index = 0
+                else:
+                    self.ring[self.index] = frame
+
+        small = cv2.resize(frame, (self.small.shape[1], self.small.shape[0]),
+                           dst=self.small, interpolation=cv2.INTER_LINEAR)
+        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self.rgb[self.index])
+        self.frames += 1
+        return True, frame, rgb
+
+    def scale_boxes(self, face_locations):
+        """Copy (top, right, bottom, left) boxes into the reused arrays and scale back.
+
+        Returns a view of the scaled boxes in full-frame coordinates.
+        """
+        n = len(face_locations)
+        if n > len(self.boxes):
+            self.boxes = np.zeros((n, 4), dtype=np.int32)
+            self.scaled = np.zeros((n, 4), dtype=np.int32)
+            self.allocations += 2
+        if n:
+            self.boxes[:n] = face_locations
+            np.multiply(self.boxes[:n], self.factor, out=self.scaled[:n])
+        return self.scaled[:n]
+
+
+
+class AllocationMeter:
+    """Allocation metric for the preprocessing stage only.
+
+    Wrap ``FramePool.read``/``scale_boxes`` with ``call``; tracemalloc
+    snapshots taken around the call are diffed and the new blocks (and bytes)
+    still alive afterwards -- i.e. arrays handed to the caller -- are counted.
+    Detection/encoding stay outside the window. Snapshots are slow, so this is
+    a diagnostic mode, not something to leave on.
+    """
+
+    def __init__(self, report_every=100):
+        self.report_every = report_every
+        self.blocks = 0
+        self.bytes = 0
+        self.frames = 0
+        self._filters = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        self._owns_tracing = not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+        # Warm up the snapshot filter's fnmatch/re caches so they aren't counted as frame allocations
+        for _ in range(2):
+            self.call(int)
+        self.blocks = self.bytes = 0
+
+    def _snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(self._filters)
+
+    def call(self, fn, *args):
+        before = self._snapshot()
+        result = fn(*args)
+        # Snapshot while `result` is still held and the caller's old buffers are not yet released
+        after = self._snapshot()
+        for stat in after.compare_to(before, "lineno"):
+            if stat.count_diff > 0:
+                self.blocks += stat.count_diff
+                self.bytes += max(0, stat.size_diff)
+        return result
+
+    def frame_done(self):
+        self.frames += 1
+        if self.frames % self.report_every == 0:
+            self.report()
+
+    def report(self):
+        print(f"[INFO] Preprocessing allocations/frame: {self.blocks_per_frame:.2f} blocks, "
+              f"{self.bytes_per_frame / 1024:.1f} KiB")
+
+    @property
+    def blocks_per_frame(self):
+        return self.blocks / self.frames if self.frames else 0.0
+
+    @property
+    def bytes_per_frame(self):
+        return self.bytes / self.frames if self.frames else 0.0
+
+    def stop(self):
+        if self._owns_tracing:
+            tracemalloc.stop()
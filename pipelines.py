@@ -2,9 +2,10 @@ import os
 import re
 from scrapy.pipelines.images import ImagesPipeline
 from scrapy import Request
+from RealTImeFaceRecog.image_ingest import OriginalBytesImagesMixin
 
 
-class RecordImagePipeline(ImagesPipeline):
+class RecordImagePipeline(OriginalBytesImagesMixin, ImagesPipeline):
     def get_media_requests(self, item, info):
         for link in item.get("photos", []):
             yield Request(
@@ -0,0 +1,181 @@
+import importlib
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+class Img:
+    """Picklable stand-in for an image array: a value plus a shape."""
+
+    def __init__(self, value, shape=(10, 10, 3)):
+        self.value = value
+        self.shape = shape
+
+
+def value(img):
+    return img.value if isinstance(img, Img) else img
+
+
+@pytest.fixture
+def stub():
+    # Odd values contain one face, negative values fail, values >= 100 are slow
+    state = types.SimpleNamespace(running=0, peak=0, batch_calls=[], lock=threading.Lock())
+    fr = types.ModuleType("face_recognition")
+
+    def face_locations(img, upsample=1, model="hog"):
+        with state.lock:
+            state.running += 1
+            state.peak = max(state.peak, state.running)
+        try:
+            v = value(img)
+            if v < 0:
+                raise ValueError("bad image")
+            if v >= 100:
+                time.sleep(0.1)
+            return [(1, 2, 3, 4)] if v % 2 else []
+        finally:
+            with state.lock:
+                state.running -= 1
+
+    def batch_face_locations(images, number_of_times_to_upsample=1, batch_size=128):
+        state.batch_calls.append(len(images))
+        return [[(1, 2, 3, 4)] if value(img) % 2 else [] for img in images]
+
+    fr.face_locations = face_locations
+    fr.batch_face_locations = batch_face_locations
+    fr.face_encodings = lambda img, locations: [value(img)] * len(locations)
+    fr.load_image_file = lambda path: int(path.read() if hasattr(path, "read") else path)
+    state.module = fr
+    return state
+
+
+@pytest.fixture
+def batching(stub, monkeypatch):
+    monkeypatch.setitem(sys.modules, "face_recognition", stub.module)
+    monkeypatch.delitem(sys.modules, "RealTImeFaceRecog.batching", raising=False)
+    # Fresh import so the module binds this test's stub
+    return importlib.import_module("RealTImeFaceRecog.batching")
+
+
+def make(batching, handled=True, workers=2, **kwargs):
+    results = []
+    batcher = batching.MicroBatcher((lambda *r: results.append(r)) if handled else None,
+                                    executor=ThreadPoolExecutor(workers), **kwargs)
+    return batcher, results
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_dispatches_when_batch_is_full(batching):
+    batcher, results = make(batching, max_batch=3)
+    batcher.add("a", 1)
+    batcher.add("b", 2)
+    assert not batcher.inflight and len(batcher.pending) == 2
+
+    batcher.add("c", 3)
+    assert not batcher.pending
+    assert wait_for(lambda: len(results) == 3)
+    assert results == [
+        ("a", [(1, 2, 3, 4)], [1], None),
+        ("b", [], [], None),
+        ("c", [(1, 2, 3, 4)], [3], None),
+    ]
+    batcher.close()
+
+
+def test_deadline_flushes_without_further_adds(batching):
+    batcher, results = make(batching, max_batch=10, max_delay=0.05)
+    batcher.add("a", 1)
+
+    assert wait_for(lambda: results)
+    assert [r[0] for r in results] == ["a"]
+    batcher.close()
+
+
+def test_close_flushes_partial_batch(batching):
+    batcher, results = make(batching, max_batch=10)
+    batcher.add("a", 1)
+    batcher.add("b", "3")
+    batcher.close()
+
+    assert [(key, enc) for key, _, enc, _ in results] == [("a", [1]), ("b", [3])]
+    with pytest.raises(RuntimeError):
+        batcher.add("c", 5)
+
+
+def test_error_only_drops_failing_item(batching):
+    batcher, results = make(batching, max_batch=3)
+    batcher.add("a", 1)
+    batcher.add("bad", -1)
+    batcher.add("c", 3)
+    batcher.close()
+
+    assert [r[0] for r in results] == ["a", "bad", "c"]
+    assert isinstance(results[1][3], ValueError)
+    assert results[0][3] is None and results[2][2] == [3]
+
+
+def test_results_keep_submission_order(batching):
+    # Live mode: no handler, poll results(); the slow first batch finishes last
+    batcher, _ = make(batching, handled=False, max_batch=1, max_in_flight=2)
+    batcher.add("slow", 101)
+    batcher.add("fast", 3)
+
+    time.sleep(0.03)
+    assert batcher.inflight[1][1].done()
+    assert batcher.results() == []
+
+    out = batcher.close()
+    assert [r[0] for r in out] == ["slow", "fast"]
+
+
+def test_max_in_flight_bounds_running_batches(batching, stub):
+    batcher, results = make(batching, max_batch=1, max_in_flight=1, workers=4)
+    for i in range(4):
+        batcher.add(i, 100 + i)
+    batcher.close()
+
+    assert [r[0] for r in results] == [0, 1, 2, 3]
+    assert stub.peak == 1
+    assert batcher.frames_held == 2
+
+
+def test_batches_overlap_across_workers(batching, stub):
+    batcher, results = make(batching, max_batch=1, max_in_flight=2, workers=2)
+    for i in range(4):
+        batcher.add(i, 100 + i)
+    batcher.close()
+
+    assert len(results) == 4 and stub.peak == 2
+
+
+def test_cnn_uses_batch_face_locations_for_same_shapes(batching, stub):
+    batcher, results = make(batching, max_batch=3, model="cnn")
+    batcher.add("a", Img(1))
+    batcher.add("b", Img(2))
+    batcher.add("c", Img(3))
+    batcher.add("d", Img(5, shape=(10, 10, 3)))
+    batcher.add("e", Img(7, shape=(20, 20, 3)))
+    batcher.close()
+
+    assert stub.batch_calls == [3]
+    assert [r[2] for r in results] == [[1], [], [3], [5], [7]]
+
+
+def test_raw_bytes_decoded_in_worker(batching):
+    batcher, results = make(batching, max_batch=2, decode=lambda data: int(data) * 10 + 1)
+    batcher.add("a", b"3")
+    batcher.add("b", b"x")
+    batcher.close()
+
+    assert results[0][2] == [31]
+    assert isinstance(results[1][3], ValueError)
@@ -0,0 +1,85 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from RealTImeFaceRecog.frame_pool import FramePool, AllocationMeter  # noqa: E402
+
+
+class FakeCapture:
+    """Stands in for cv2.VideoCapture: fills `image` in place when it fits."""
+
+    def __init__(self, shapes):
+        self.shapes = list(shapes)
+        self.count = 0
+
+    def read(self, image=None):
+        if not self.shapes:
+            return False, None
+        shape = self.shapes.pop(0)
+        self.count += 1
+        if image is None or image.shape != shape:
+            image = np.empty(shape, dtype=np.uint8)
+        image[...] = self.count
+        return True, image
+
+
+def test_ring_wraps_without_new_buffers():
+    pool = FramePool(FakeCapture([(40, 80, 3)] * 7), scale=0.25, ring_size=3)
+
+    seen = []
+    for _ in range(7):
+        ok, frame, rgb = pool.read()
+        assert ok
+        assert rgb.shape == (10, 20, 3)
+        assert frame[0, 0, 0] == rgb[0, 0, 0] == pool.frames
+        seen.append(id(frame))
+
+    assert seen[:3] == seen[3:6] and seen[6] == seen[0]
+    assert len(set(seen)) == 3
+    assert pool.allocations == 2 * 3 + 1
+    assert pool.read()[0] is False
+
+
+def test_shape_change_reallocates_buffers():
+    pool = FramePool(FakeCapture([(40, 80, 3), (40, 80, 3), (80, 160, 3), (80, 160, 3)]), ring_size=2)
+    pool.read()
+    pool.read()
+    first_allocations = pool.allocations
+
+    ok, frame, rgb = pool.read()
+    assert ok and frame.shape == (80, 160, 3) and rgb.shape == (20, 40, 3)
+    assert pool.ring[0] is frame and pool.ring[1].shape == frame.shape
+    assert pool.allocations > first_allocations
+
+    ok, frame, rgb = pool.read()
+    assert frame is pool.ring[1]
+
+
+def test_scale_boxes_reuses_and_grows_arrays():
+    pool = FramePool(FakeCapture([]), scale=0.25, max_faces=2)
+    scaled = pool.scale_boxes([(1, 2, 3, 4)])
+    assert scaled.tolist() == [[4, 8, 12, 16]]
+    assert scaled.base is pool.scaled
+
+    assert pool.scale_boxes([]).shape == (0, 4)
+
+    scaled = pool.scale_boxes([(1, 1, 1, 1)] * 3)
+    assert scaled.shape == (3, 4) and (scaled == 4).all()
+    assert pool.allocations == 2
+
+
+def test_allocation_meter_counts_only_wrapped_calls():
+    meter = AllocationMeter()
+    try:
+        keep = np.zeros(1000)
+        meter.call(lambda: None)
+        meter.frame_done()
+        assert meter.blocks == 0
+
+        fresh = meter.call(np.ones, 1000)
+        meter.frame_done()
+        assert meter.blocks >= 1 and meter.bytes >= fresh.nbytes
+        assert meter.frames == 2 and keep.shape == (1000,)
+    finally:
+        meter.stop()
@@ -0,0 +1,84 @@
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("scrapy")
+Image = pytest.importorskip("PIL.Image")
+
+from scrapy import Request  # noqa: E402
+from scrapy.http import Response  # noqa: E402
+from scrapy.pipelines.images import ImageException, ImagesPipeline  # noqa: E402
+from scrapy.utils.test import get_crawler  # noqa: E402
+
+from RealTImeFaceRecog.image_ingest import OriginalBytesImagesMixin, DETECT_SIZE, open_draft  # noqa: E402
+
+
+class Pipeline(OriginalBytesImagesMixin, ImagesPipeline):
+    checked = None
+
+    def file_path(self, request, response=None, info=None, *, item=None):
+        return "person.jpg"
+
+    def image_checked(self, request, body):
+        self.checked.append(request.url)
+
+
+def make(tmp_path, **settings):
+    crawler = get_crawler(settings_dict={"IMAGES_STORE": str(tmp_path), **settings})
+    pipeline = Pipeline.from_crawler(crawler)
+    pipeline.checked = []
+    return pipeline
+
+
+def encode(fmt, size=(400, 500)):
+    buf = BytesIO()
+    Image.new("RGB", size, (10, 20, 30)).save(buf, fmt)
+    return buf.getvalue()
+
+
+def run(pipeline, body):
+    request = Request("http://example.com/a b/400x800.jpg")
+    response = Response(request.url, body=body, request=request)
+    return list(pipeline.get_images(response, request, None))
+
+
+def test_jpeg_bytes_stored_untouched_with_real_size(tmp_path):
+    body = encode("JPEG")
+    pipeline = make(tmp_path)
+    [(path, image, buf)] = run(pipeline, body)
+
+    assert path == "person.jpg"
+    assert buf.getvalue() == body
+    assert image.size == (400, 500)
+    assert pipeline.checked == [Request("http://example.com/a b/400x800.jpg").url]
+
+
+def test_non_jpeg_is_reencoded_as_jpeg(tmp_path):
+    pipeline = make(tmp_path)
+    [(_, _, buf)] = run(pipeline, encode("PNG"))
+
+    assert Image.open(buf).format == "JPEG"
+    assert len(pipeline.checked) == 1
+
+
+def test_min_size_check_kept(tmp_path):
+    pipeline = make(tmp_path, IMAGES_MIN_WIDTH=500)
+    with pytest.raises(ImageException):
+        run(pipeline, encode("JPEG"))
+    with pytest.raises(ImageException):
+        run(pipeline, encode("PNG"))
+    assert pipeline.checked == []
+
+
+def test_thumbnails_still_generated(tmp_path):
+    pipeline = make(tmp_path, IMAGES_THUMBS={"small": (50, 50)})
+    results = run(pipeline, encode("JPEG"))
+
+    assert len(results) == 2
+    assert max(results[1][1].size) <= 50
+
+
+def test_draft_decode_halves_scraped_mugshots():
+    for height in (225, 272, 500, 533):
+        assert open_draft(encode("JPEG", (400, height))).size == (200, (height + 1) // 2)
+    assert DETECT_SIZE == (200, 112)